@@ -19,7 +19,10 @@ class AIRuleGenerator:
     and generate intelligent transformation rules.
     """
 
-    def __init__(self, source_ontology: str, target_ontology: str, api_key: Optional[str] = None, verify_ssl: bool = True):
+    def __init__(self, source_ontology: Optional[str], target_ontology: Optional[str],
+                 api_key: Optional[str] = None, verify_ssl: bool = True,
+                 source_analyzer: Optional[OntologyAnalyzer] = None,
+                 target_analyzer: Optional[OntologyAnalyzer] = None):
         """
         Initialize AI rule generator.
 
@@ -29,9 +32,11 @@ class AIRuleGenerator:
             api_key: Anthropic API key (or use ANTHROPIC_API_KEY env var)
             verify_ssl: Whether to verify SSL certificates (default: True)
                        Set to False if you have SSL certificate issues in corporate environments
+            source_analyzer: Already-analyzed source ontology; skips parsing source_ontology
+            target_analyzer: Already-analyzed target ontology; skips parsing target_ontology
         """
-        self.source_analyzer = OntologyAnalyzer(source_ontology)
-        self.target_analyzer = OntologyAnalyzer(target_ontology)
+        self.source_analyzer = source_analyzer or OntologyAnalyzer(source_ontology)
+        self.target_analyzer = target_analyzer or OntologyAnalyzer(target_ontology)
 
         # Initialize Anthropic client
         api_key = api_key or os.environ.get('ANTHROPIC_API_KEY')
@@ -44,9 +49,20 @@ class AIRuleGenerator:
         self.client = anthropic.Anthropic(api_key=api_key, http_client=http_client)
 
         self.ai_suggestions = None
+        # (analyzer, ontology_name) -> structure; analyzers hash by identity and
+        # are kept alive by the key, so a recycled id() can never alias an entry
+        self._structures = {}
 
     def _extract_ontology_structure(self, analyzer: OntologyAnalyzer, ontology_name: str) -> Dict[str, Any]:
-        """Extract ontology structure for AI analysis."""
+        """
+        Extract ontology structure for AI analysis (cached per analyzer and name).
+
+        The cached dictionary is returned by reference; callers must not modify it.
+        """
+        key = (analyzer, ontology_name)
+        if key in self._structures:
+            return self._structures[key]
+
         structure = {
             "ontology_name": ontology_name,
             "namespace": analyzer.namespace,
@@ -73,6 +89,7 @@ class AIRuleGenerator:
 
             structure["classes"].append(cls_info)
 
+        self._structures[key] = structure
         return structure
 
     def analyze_with_ai(self) -> Dict[str, Any]:
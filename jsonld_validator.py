@@ -15,6 +15,13 @@ from dataclasses import dataclass, field
 from rdflib import Graph, Namespace, RDF, RDFS, OWL, XSD
 
 
+_SNAKE_CASE_RE = re.compile(r'^[a-z][a-z0-9_]*$')
+# Insert underscore before capitals
+_SNAKE_RE1 = re.compile(r'(.)([A-Z][a-z]+)')
+# Insert underscore before capitals preceded by lowercase
+_SNAKE_RE2 = re.compile(r'([a-z0-9])([A-Z])')
+
+
 @dataclass
 class ValidationIssue:
     """Represents a validation issue found in JSON-LD data."""
@@ -398,13 +405,13 @@ class OntologyValidator:
     def _is_snake_case(self, name: str) -> bool:
         """Check if name is in snake_case."""
         # Allow underscores and lowercase letters/numbers
-        return re.match(r'^[a-z][a-z0-9_]*$', name) is not None
+        return _SNAKE_CASE_RE.match(name) is not None
 
     def _to_snake_case(self, name: str) -> str:
         """Convert camelCase to snake_case."""
         # Insert underscore before uppercase letters
-        s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
-        return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+        s1 = _SNAKE_RE1.sub(r'\1_\2', name)
+        return _SNAKE_RE2.sub(r'\1_\2', s1).lower()
 
     def _json_to_ontology_name(self, json_name: str) -> str:
         """Convert JSON-LD field name to ontology property name."""
@@ -0,0 +1,31 @@
+"""
+Parallel runner shared by the test modules' --parallel flag.
+
+Equivalent to running `pytest -n auto <test module>` when pytest-xdist is
+installed; otherwise the module's own sequential runner is used.
+"""
+
+import importlib.util
+import unittest
+from typing import Callable
+
+
+def run_tests_parallel(module_file: str, run_sequential: Callable[[], unittest.TestResult]) -> int:
+    """
+    Run a test module's tests across all cores with pytest-xdist.
+
+    Falls back to run_sequential() when pytest-xdist is not installed.
+
+    Args:
+        module_file: Path of the test module to run (its __file__)
+        run_sequential: The module's sequential runner, returning its TestResult
+
+    Returns:
+        Process exit code
+    """
+    if importlib.util.find_spec("xdist") is None:
+        result = run_sequential()
+        return 0 if result.wasSuccessful() else 1
+
+    import pytest
+    return pytest.main(["-n", "auto", module_file])
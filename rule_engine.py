@@ -13,6 +13,11 @@ from datetime import datetime
 from copy import deepcopy
 import re
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 class RuleEngine:
     """
@@ -28,7 +33,30 @@ class RuleEngine:
             rules_file: Path to YAML file containing transformation rules
         """
         with open(rules_file, 'r', encoding='utf-8') as f:
-            self.rules = yaml.safe_load(f)
+            rules = yaml.load(f, Loader=SafeLoader)
+
+        self._init_from_dict(rules)
+
+    @classmethod
+    def from_rules(cls, rules: Dict[str, Any]) -> 'RuleEngine':
+        """
+        Create a rule engine from an already-parsed rules dictionary.
+
+        The dictionary is shared, not copied; the engine never modifies it.
+
+        Args:
+            rules: Transformation rules as loaded from a rules YAML file
+
+        Returns:
+            RuleEngine using the given rules
+        """
+        engine = cls.__new__(cls)
+        engine._init_from_dict(rules)
+        return engine
+
+    def _init_from_dict(self, rules: Dict[str, Any]) -> None:
+        """Set up the engine state from a parsed rules dictionary."""
+        self.rules = rules
 
         self.constants = self.rules.get('constants', {})
         self.metadata = self.rules.get('metadata', {})
@@ -112,18 +140,23 @@ class RuleEngine:
     ) -> Dict[str, Any]:
         """Transform manufacturing activities to emissions."""
         activities = self._get_nested_value(source_data, step.get('source'))
+        emissions = []
+
         if not activities:
-            activities = []
+            # Nothing to map; skip resolving the substeps entirely
+            target_data['emissions'] = emissions
+            return target_data
 
-        emissions = []
+        # Resolve each substep's relative source path and mappings once
+        substeps = [
+            (substep.get('source', '').replace('$.', ''), substep.get('mapping', []))
+            for substep in step.get('substeps', [])
+        ]
 
         for activity in activities:
             # Process each energy consumption in the activity
-            for substep in step.get('substeps', []):
-                energy_consumptions = self._get_nested_value(
-                    activity,
-                    substep.get('source', '').replace('$.', '')
-                )
+            for source_path, mappings in substeps:
+                energy_consumptions = self._get_nested_value(activity, source_path)
 
                 if not energy_consumptions:
                     continue
@@ -132,7 +165,7 @@ class RuleEngine:
                     emission = self._build_emission_entry(
                         consumption,
                         activity,
-                        substep.get('mapping', [])
+                        mappings
                     )
                     emissions.append(emission)
 
@@ -7,164 +7,370 @@ generates declarative transformation rules in YAML format.
 The generator creates a complete MDA transformation pipeline from ontology definitions.
 """
 
+import os
+import tempfile
 import yaml
 from rdflib import Graph, Namespace, RDF, RDFS, OWL
-from typing import Dict, List, Any, Set, Tuple, Optional
+from typing import Dict, List, Any, Set, Tuple, Optional, TextIO
 from collections import defaultdict
+from functools import lru_cache
+from itertools import chain
 import re
 
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper
+
+
+_WORD_RE = re.compile(r'\w+')
+_NUMERIC_TYPES = frozenset([
+    'http://www.w3.org/2001/XMLSchema#decimal',
+    'http://www.w3.org/2001/XMLSchema#integer',
+    'http://www.w3.org/2001/XMLSchema#float',
+    'http://www.w3.org/2001/XMLSchema#double'
+])
+# Insert underscore before capitals
+_SNAKE_RE1 = re.compile(r'(.)([A-Z][a-z]+)')
+# Insert underscore before capitals preceded by lowercase
+_SNAKE_RE2 = re.compile(r'([a-z0-9])([A-Z])')
+
+
+@lru_cache(maxsize=4096)
+def to_snake_case(name: str) -> str:
+    """Convert camelCase or PascalCase to snake_case."""
+    return _SNAKE_RE2.sub(r'\1_\2', _SNAKE_RE1.sub(r'\1_\2', name)).lower()
+
+
+@lru_cache(maxsize=None)
+def pluralize(word: str) -> str:
+    """Simple pluralization."""
+    if word.endswith('y'):
+        return word[:-1] + 'ies'
+    elif word.endswith('s'):
+        return word + 'es'
+    else:
+        return word + 's'
+
+
+def similarity_score(str1: str, str2: str) -> float:
+    """Calculate semantic similarity between two strings."""
+    # Exact match, unless there are no words to compare
+    if str1 == str2:
+        return 1.0 if _WORD_RE.search(str1) else 0.0
+
+    # Simple word-based similarity
+    vocab = {}
+    masks = []
+    counts = []
+    for text in (str1, str2):
+        words = set(_WORD_RE.findall(text.lower()))
+        mask = 0
+        for word in words:
+            mask |= 1 << vocab.setdefault(word, len(vocab))
+        masks.append(mask)
+        counts.append(len(words))
+
+    return _similarity_score_masks(
+        str1, masks[0], counts[0], str2, masks[1], counts[1]
+    )
+
+
+def _similarity_score_masks(str1: str, mask1: int, count1: int,
+                           str2: str, mask2: int, count2: int) -> float:
+    """
+    Calculate similarity between two strings with pre-encoded tokens.
+
+    Args:
+        str1, str2: Lowercased labels
+        mask1, mask2: Token bitmasks over a shared vocabulary
+        count1, count2: Number of tokens (set bits) in each mask
+    """
+    if not mask1 or not mask2:
+        return 0.0
+
+    # Exact match bonus
+    if str1 == str2:
+        return 1.0
+
+    substring = str1 in str2 or str2 in str1
+
+    # No shared words: only the substring bonus can apply
+    shared = mask1 & mask2
+    if not shared:
+        return 0.7 if substring else 0.0
+
+    # Jaccard similarity; |A | B| = |A| + |B| - |A & B|
+    intersection = shared.bit_count()
+    jaccard = intersection / (count1 + count2 - intersection)
+
+    # Substring match bonus
+    if substring:
+        return max(jaccard, 0.7)
+
+    return jaccard
+
 
 class OntologyAnalyzer:
     """Analyzes an RDF ontology to extract structure and semantics."""
 
-    def __init__(self, ontology_file: str):
-        """Load and analyze an ontology file."""
-        self.graph = Graph()
-        self.graph.parse(ontology_file, format='turtle')
+    def __init__(self, ontology_file: str, use_cache: bool = False):
+        """
+        Load and analyze an ontology file.
+
+        Args:
+            ontology_file: Path to ontology TTL file
+            use_cache: Reuse (or write) an N-Triples cache next to the file
+        """
+        if use_cache:
+            self.graph = self._parse_cached(ontology_file)
+        else:
+            self.graph = Graph()
+            self.graph.parse(ontology_file, format='turtle')
 
         self.classes = set()
         self.properties = {}  # property -> (domain, range, type)
         self.namespace = None
 
+        self._local_names = {}  # resource -> local name
+        self._labels = {}  # resource -> label
+        self._lower_labels = {}  # resource -> lowercased label
+        self._tokens = {}  # resource -> frozenset of lowercased label words
+        self.snake_local = {}  # resource -> snake_case local name
+        self._props_by_domain = defaultdict(list)  # class -> properties
+        self._numeric_props_by_domain = defaultdict(list)  # class -> numeric properties
+
         self._analyze()
 
+    @classmethod
+    def load(cls, ontology_file: str) -> 'OntologyAnalyzer':
+        """Load and analyze an ontology file, using the N-Triples cache."""
+        return cls(ontology_file, use_cache=True)
+
+    @staticmethod
+    def _parse_cached(ontology_file: str) -> Graph:
+        """
+        Parse an ontology file via a '<file>.cache.nt' N-Triples cache.
+
+        N-Triples is much faster for rdflib to parse than Turtle. The cache
+        starts with a comment line recording the ontology file's mtime and
+        size; it is used only while both still match and rewritten otherwise.
+        """
+        cache_file = ontology_file + '.cache.nt'
+        source_stat = os.stat(ontology_file)
+        header = f"# source mtime_ns={source_stat.st_mtime_ns} size={source_stat.st_size}\n".encode('ascii')
+        graph = Graph()
+
+        try:
+            with open(cache_file, 'rb') as f:
+                cache_is_fresh = f.readline() == header
+        except OSError:
+            cache_is_fresh = False
+
+        if cache_is_fresh:
+            graph.parse(cache_file, format='nt')
+            return graph
+
+        graph.parse(ontology_file, format='turtle')
+
+        # Write to a unique temp file and publish it atomically, so concurrent
+        # writers never expose a partly written cache
+        tmp_file = None
+        try:
+            fd, tmp_file = tempfile.mkstemp(
+                dir=os.path.dirname(cache_file) or '.',
+                prefix=os.path.basename(cache_file) + '.',
+                suffix='.tmp'
+            )
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.write(graph.serialize(format='nt', encoding='utf-8'))
+            os.replace(tmp_file, cache_file)
+            tmp_file = None
+        except OSError:
+            pass  # Cache location not writable; parse the Turtle file next time
+        finally:
+            if tmp_file is not None:
+                try:
+                    os.unlink(tmp_file)
+                except OSError:
+                    pass
+
+        return graph
+
     def _analyze(self):
         """Analyze the ontology structure."""
         # Extract namespace
         self._extract_namespace()
 
-        # Extract classes
-        for cls in self.graph.subjects(RDF.type, OWL.Class):
-            if not str(cls).startswith('http://www.w3.org'):
-                self.classes.add(cls)
-
-        # Extract properties
-        for prop in self.graph.subjects(RDF.type, OWL.DatatypeProperty):
-            domain = self._get_property_domain(prop)
-            range_type = self._get_property_range(prop)
+        # Collect declared types, domains and ranges with one scan per predicate
+        datatype_props = []
+        object_props = []
+        for subj, _, obj in self.graph.triples((None, RDF.type, None)):
+            if obj == OWL.Class:
+                if not str(subj).startswith('http://www.w3.org'):
+                    self.classes.add(subj)
+            elif obj == OWL.DatatypeProperty:
+                datatype_props.append(subj)
+            elif obj == OWL.ObjectProperty:
+                object_props.append(subj)
+
+        domains = {}
+        for prop, _, domain in self.graph.triples((None, RDFS.domain, None)):
+            domains.setdefault(prop, domain)
+
+        ranges = {}
+        for prop, _, range_type in self.graph.triples((None, RDFS.range, None)):
+            ranges.setdefault(prop, range_type)
+
+        # Extract properties (object properties win if declared as both)
+        property_types = chain(
+            ((prop, 'datatype') for prop in datatype_props),
+            ((prop, 'object') for prop in object_props)
+        )
+        for prop, prop_type in property_types:
             self.properties[prop] = {
-                'type': 'datatype',
-                'domain': domain,
-                'range': range_type
+                'type': prop_type,
+                'domain': domains.get(prop),
+                'range': ranges.get(prop)
             }
 
-        for prop in self.graph.subjects(RDF.type, OWL.ObjectProperty):
-            domain = self._get_property_domain(prop)
-            range_type = self._get_property_range(prop)
-            self.properties[prop] = {
-                'type': 'object',
-                'domain': domain,
-                'range': range_type
-            }
+        # Index properties by domain
+        for prop, info in self.properties.items():
+            self._props_by_domain[info['domain']].append(prop)
+            if info['range'] and str(info['range']) in _NUMERIC_TYPES:
+                self._numeric_props_by_domain[info['domain']].append(prop)
+
+        # Cache labels and their tokens for similarity matching
+        self._index_labels()
+
+        # Cache snake_case local names used as JSON field names
+        self.snake_local = {
+            resource: to_snake_case(self._get_local_name(resource))
+            for resource in chain(self.classes, self.properties)
+        }
+
+    def _index_labels(self):
+        """Cache the label, lowercased label and word tokens of each resource."""
+        for resource in chain(self.classes, self.properties):
+            label = self.get_label(resource)
+            lower = label.lower()
+            self._labels[resource] = label
+            self._lower_labels[resource] = lower
+            self._tokens[resource] = frozenset(_WORD_RE.findall(lower))
+
+    def _token_masks(self, vocab: Dict[str, int]) -> Dict[Any, int]:
+        """
+        Encode each resource's label tokens as an integer bitmask.
+
+        Args:
+            vocab: Shared token -> bit index mapping; unseen tokens are added
+
+        Returns:
+            Dictionary mapping resource to its token bitmask
+        """
+        masks = {}
+        for resource, tokens in self._tokens.items():
+            mask = 0
+            for token in tokens:
+                mask |= 1 << vocab.setdefault(token, len(vocab))
+            masks[resource] = mask
+        return masks
 
     def _extract_namespace(self):
         """Extract the main namespace of the ontology."""
+        # Stop at the first hash-style class URI; skip slash-style ones
         for cls in self.graph.subjects(RDF.type, OWL.Class):
-            cls_str = str(cls)
-            if '#' in cls_str:
-                self.namespace = cls_str.split('#')[0] + '#'
+            head, sep, _ = str(cls).partition('#')
+            if sep:
+                self.namespace = head + sep
                 break
 
-    def _get_property_domain(self, prop):
-        """Get the domain of a property."""
-        for domain in self.graph.objects(prop, RDFS.domain):
-            return domain
-        return None
-
-    def _get_property_range(self, prop):
-        """Get the range of a property."""
-        for range_type in self.graph.objects(prop, RDFS.range):
-            return range_type
-        return None
-
     def get_class_properties(self, cls) -> List[Any]:
         """Get all properties for a class."""
-        props = []
-        for prop, info in self.properties.items():
-            if info['domain'] == cls:
-                props.append(prop)
-        return props
+        return list(self._props_by_domain.get(cls, ()))
 
     def get_label(self, resource) -> str:
         """Get the label of a resource."""
+        if resource in self._labels:
+            return self._labels[resource]
+        # Prefer an untagged or English (en, en-US, ...) label, otherwise
+        # fall back to the first label of any language
+        first = None
         for label in self.graph.objects(resource, RDFS.label):
-            label_str = str(label)
-            if '@en' in label_str or '@' not in label_str:
-                return label_str.split('@')[0].strip('"')
+            language = getattr(label, 'language', None)
+            if language is None or language.lower().split('-')[0] == 'en':
+                return str(label)
+            if first is None:
+                first = str(label)
+        if first is not None:
+            return first
         return self._get_local_name(resource)
 
     def _get_local_name(self, resource) -> str:
         """Extract local name from URI."""
-        uri = str(resource)
-        if '#' in uri:
-            return uri.split('#')[-1]
-        elif '/' in uri:
-            return uri.split('/')[-1]
-        return uri
+        local_name = self._local_names.get(resource)
+        if local_name is None:
+            uri = str(resource)
+            _, sep, tail = uri.rpartition('#')
+            # Without '#' fall back to the last path segment (or the whole URI)
+            local_name = tail if sep else uri.rpartition('/')[2]
+            self._local_names[resource] = local_name
+        return local_name
 
     def get_numeric_properties(self, cls) -> List[Any]:
         """Get numeric properties of a class."""
-        numeric_types = [
-            'http://www.w3.org/2001/XMLSchema#decimal',
-            'http://www.w3.org/2001/XMLSchema#integer',
-            'http://www.w3.org/2001/XMLSchema#float',
-            'http://www.w3.org/2001/XMLSchema#double'
-        ]
-
-        numeric_props = []
-        for prop in self.get_class_properties(cls):
-            prop_range = self.properties[prop]['range']
-            if prop_range and str(prop_range) in numeric_types:
-                numeric_props.append(prop)
-
-        return numeric_props
+        return list(self._numeric_props_by_domain.get(cls, ()))
 
 
 class RuleGenerator:
     """Generates transformation rules from source and target ontologies."""
 
-    def __init__(self, source_ontology: str, target_ontology: str):
+    def __init__(self, source_ontology: str, target_ontology: str, use_cache: bool = False,
+                 source_analyzer: Optional[OntologyAnalyzer] = None,
+                 target_analyzer: Optional[OntologyAnalyzer] = None):
         """
         Initialize rule generator.
 
         Args:
             source_ontology: Path to source ontology TTL file
             target_ontology: Path to target ontology TTL file
+            use_cache: Load ontologies through their N-Triples caches
+            source_analyzer: Already-analyzed source ontology; skips parsing source_ontology
+            target_analyzer: Already-analyzed target ontology; skips parsing target_ontology
         """
-        self.source_analyzer = OntologyAnalyzer(source_ontology)
-        self.target_analyzer = OntologyAnalyzer(target_ontology)
+        self.source_analyzer = source_analyzer or OntologyAnalyzer(source_ontology, use_cache=use_cache)
+        self.target_analyzer = target_analyzer or OntologyAnalyzer(target_ontology, use_cache=use_cache)
 
         self.class_mappings = {}
         self.property_mappings = {}
 
+        # Label token sets as bitmasks over a vocabulary shared by both ontologies
+        self._token_vocab = {}
+        self._source_masks = self.source_analyzer._token_masks(self._token_vocab)
+        self._target_masks = self.target_analyzer._token_masks(self._token_vocab)
+
         self._infer_mappings()
 
     def _infer_mappings(self):
         """Infer class and property mappings based on semantic similarity."""
         print("\n=== Class Mapping Analysis ===")
 
-        # Simple name-based matching for classes
-        for src_cls in self.source_analyzer.classes:
-            src_name = self.source_analyzer.get_label(src_cls).lower()
-
-            best_match = None
-            best_score = 0
-
-            for tgt_cls in self.target_analyzer.classes:
-                tgt_name = self.target_analyzer.get_label(tgt_cls).lower()
-                score = self._similarity_score(src_name, tgt_name)
+        source = self.source_analyzer
+        target = self.target_analyzer
 
-                if score > best_score and score > 0.3:
-                    best_score = score
-                    best_match = tgt_cls
+        # Simple name-based matching for classes
+        source_classes = list(source.classes)
+        class_matches = self._pairwise_best(source_classes, list(target.classes), 0.3)
 
+        for src_cls, (best_match, best_score) in zip(source_classes, class_matches):
             if best_match:
                 self.class_mappings[src_cls] = best_match
-                src_label = self.source_analyzer.get_label(src_cls)
-                tgt_label = self.target_analyzer.get_label(best_match)
+                src_label = source.get_label(src_cls)
+                tgt_label = target.get_label(best_match)
                 print(f"  ✓ {src_label} → {tgt_label} (score: {best_score:.2f})")
             else:
-                src_label = self.source_analyzer.get_label(src_cls)
+                src_label = source.get_label(src_cls)
                 print(f"  ✗ {src_label} → No match found")
 
         print(f"\nTotal class mappings: {len(self.class_mappings)}")
@@ -173,39 +379,27 @@ class RuleGenerator:
         print("\n=== Property Mapping Analysis ===")
 
         for src_cls, tgt_cls in self.class_mappings.items():
-            src_cls_name = self.source_analyzer.get_label(src_cls)
-            tgt_cls_name = self.target_analyzer.get_label(tgt_cls)
+            src_cls_name = source.get_label(src_cls)
+            tgt_cls_name = target.get_label(tgt_cls)
             print(f"\nFor class mapping: {src_cls_name} → {tgt_cls_name}")
 
-            src_props = self.source_analyzer.get_class_properties(src_cls)
-            tgt_props = self.target_analyzer.get_class_properties(tgt_cls)
+            src_props = source.get_class_properties(src_cls)
+            tgt_props = target.get_class_properties(tgt_cls)
+            prop_matches = self._pairwise_best(src_props, tgt_props, 0.4)
 
             prop_count = 0
-            for src_prop in src_props:
-                src_prop_name = self.source_analyzer.get_label(src_prop).lower()
-
-                best_match = None
-                best_score = 0
-
-                for tgt_prop in tgt_props:
-                    tgt_prop_name = self.target_analyzer.get_label(tgt_prop).lower()
-                    score = self._similarity_score(src_prop_name, tgt_prop_name)
-
-                    if score > best_score and score > 0.4:
-                        best_score = score
-                        best_match = tgt_prop
-
+            for src_prop, (best_match, best_score) in zip(src_props, prop_matches):
                 if best_match:
                     if src_cls not in self.property_mappings:
                         self.property_mappings[src_cls] = {}
                     self.property_mappings[src_cls][src_prop] = best_match
 
-                    src_prop_label = self.source_analyzer.get_label(src_prop)
-                    tgt_prop_label = self.target_analyzer.get_label(best_match)
+                    src_prop_label = source.get_label(src_prop)
+                    tgt_prop_label = target.get_label(best_match)
                     print(f"    ✓ {src_prop_label} → {tgt_prop_label} (score: {best_score:.2f})")
                     prop_count += 1
                 else:
-                    src_prop_label = self.source_analyzer.get_label(src_prop)
+                    src_prop_label = source.get_label(src_prop)
                     print(f"    ✗ {src_prop_label} → No match found")
 
             print(f"  Properties mapped: {prop_count}/{len(src_props)}")
@@ -213,30 +407,86 @@ class RuleGenerator:
         total_props = sum(len(v) for v in self.property_mappings.values())
         print(f"\nTotal property mappings: {total_props}")
 
-    def _similarity_score(self, str1: str, str2: str) -> float:
-        """Calculate semantic similarity between two strings."""
-        # Simple word-based similarity
-        words1 = set(re.findall(r'\w+', str1.lower()))
-        words2 = set(re.findall(r'\w+', str2.lower()))
+    def _pairwise_best(self, sources: List[Any], targets: List[Any],
+                       threshold: float) -> List[Tuple[Optional[Any], float]]:
+        """
+        Find the best matching target for each source class or property.
 
-        if not words1 or not words2:
-            return 0.0
+        Targets are laid out as parallel lists (label, token mask, token
+        count) and indexed by label token once, then every source is
+        scored against them:
 
-        intersection = words1 & words2
-        union = words1 | words2
+        - Only targets sharing a label token with the source can have a
+          non-zero Jaccard score, so only those are fully scored.
+        - Candidates whose Jaccard upper bound (ratio of token counts)
+          cannot beat the best score are skipped.
+        - The other targets can score at most 0.7 through the substring
+          bonus and are skipped once that can no longer beat the best score.
 
-        # Jaccard similarity
-        jaccard = len(intersection) / len(union)
+        Targets are visited in order, so ties go to the first best target.
 
-        # Exact match bonus
-        if str1 == str2:
-            return 1.0
+        Args:
+            sources: Source resources
+            targets: Target resources, in matching order
+            threshold: Minimum score (exclusive) for a match
 
-        # Substring match bonus
-        if str1 in str2 or str2 in str1:
-            return max(jaccard, 0.7)
+        Returns:
+            List of (best matching target or None, best score), one per source
+        """
+        source = self.source_analyzer
+        target = self.target_analyzer
+
+        tgt_names = [target._lower_labels[tgt] for tgt in targets]
+        tgt_masks = [self._target_masks[tgt] for tgt in targets]
+        tgt_counts = [len(target._tokens[tgt]) for tgt in targets]
+
+        # Inverted index: label token -> target positions
+        index = defaultdict(list)
+        for pos, tgt in enumerate(targets):
+            for token in target._tokens[tgt]:
+                index[token].append(pos)
+
+        results = []
+        for src in sources:
+            src_name = source._lower_labels[src]
+            src_mask = self._source_masks[src]
+            src_tokens = source._tokens[src]
+            src_count = len(src_tokens)
+
+            candidates = set()
+            for token in src_tokens:
+                candidates.update(index.get(token, ()))
+
+            best_pos = None
+            best_score = 0
+
+            for pos, tgt_name in enumerate(tgt_names):
+                tgt_mask = tgt_masks[pos]
+
+                if pos in candidates:
+                    if not (src_name in tgt_name or tgt_name in src_name):
+                        # Jaccard cannot exceed min(|A|, |B|) / max(|A|, |B|)
+                        tgt_count = tgt_counts[pos]
+                        bound = min(src_count, tgt_count) / max(src_count, tgt_count)
+                        if bound <= best_score or bound <= threshold:
+                            continue
+                    score = _similarity_score_masks(
+                        src_name, src_mask, src_count, tgt_name, tgt_mask, tgt_counts[pos]
+                    )
+                elif best_score >= 0.7 or not src_mask or not tgt_mask:
+                    continue
+                elif src_name in tgt_name or tgt_name in src_name:
+                    score = 0.7
+                else:
+                    continue
+
+                if score > best_score and score > threshold:
+                    best_score = score
+                    best_pos = pos
 
-        return jaccard
+            results.append((targets[best_pos] if best_pos is not None else None, best_score))
+
+        return results
 
     def generate_rules(self,
                       transformation_name: str = "Auto-Generated Transformation",
@@ -289,17 +539,11 @@ class RuleGenerator:
     def _get_root_class_name(self) -> str:
         """Get the root target class name."""
         # Find the most likely root class (one without being a range of others)
-        root_classes = []
-
-        for cls in self.target_analyzer.classes:
-            is_root = True
-            for prop_info in self.target_analyzer.properties.values():
-                if prop_info['range'] == cls:
-                    is_root = False
-                    break
-
-            if is_root:
-                root_classes.append(cls)
+        ranges = {
+            info['range'] for info in self.target_analyzer.properties.values()
+            if info['range'] is not None
+        }
+        root_classes = [cls for cls in self.target_analyzer.classes if cls not in ranges]
 
         if root_classes:
             cls = root_classes[0]
@@ -318,12 +562,8 @@ class RuleGenerator:
                 continue
 
             for src_prop, tgt_prop in self.property_mappings[src_cls].items():
-                src_prop_name = self.source_analyzer._get_local_name(src_prop)
-                tgt_prop_name = self.target_analyzer._get_local_name(tgt_prop)
-
-                # Convert to snake_case
-                src_path = self._to_snake_case(src_prop_name)
-                tgt_path = self._to_snake_case(tgt_prop_name)
+                src_path = self.source_analyzer.snake_local[src_prop]
+                tgt_path = self.target_analyzer.snake_local[tgt_prop]
 
                 # Only add simple datatype properties to field mappings
                 src_prop_info = self.source_analyzer.properties.get(src_prop, {})
@@ -344,13 +584,14 @@ class RuleGenerator:
         for src_cls, tgt_cls in self.class_mappings.items():
             src_local = self.source_analyzer._get_local_name(src_cls)
             tgt_local = self.target_analyzer._get_local_name(tgt_cls)
+            src_snake = self.source_analyzer.snake_local[src_cls]
 
             # Create transformation step for collections
             step = {
-                'name': f'transform_{self._to_snake_case(src_local)}',
+                'name': f'transform_{src_snake}',
                 'description': f'Transform {src_local} to {tgt_local}',
-                'source': self._to_snake_case(self._pluralize(src_local)),
-                'target': self._to_snake_case(self._pluralize(tgt_local)),
+                'source': to_snake_case(pluralize(src_local)),
+                'target': to_snake_case(pluralize(tgt_local)),
                 'iteration': True,
                 'substeps': []
             }
@@ -358,21 +599,14 @@ class RuleGenerator:
             # Add property mappings as substep
             if src_cls in self.property_mappings:
                 substep = {
-                    'name': f'map_{self._to_snake_case(src_local)}_fields',
+                    'name': f'map_{src_snake}_fields',
                     'mapping': []
                 }
 
                 for src_prop, tgt_prop in self.property_mappings[src_cls].items():
-                    src_prop_name = self._to_snake_case(
-                        self.source_analyzer._get_local_name(src_prop)
-                    )
-                    tgt_prop_name = self._to_snake_case(
-                        self.target_analyzer._get_local_name(tgt_prop)
-                    )
-
                     substep['mapping'].append({
-                        'target': tgt_prop_name,
-                        'source': src_prop_name
+                        'target': self.target_analyzer.snake_local[tgt_prop],
+                        'source': self.source_analyzer.snake_local[src_prop]
                     })
 
                 step['substeps'].append(substep)
@@ -386,15 +620,13 @@ class RuleGenerator:
         calc_rules = []
 
         # Look for numeric properties that might need calculations
+        numeric_props_by_domain = self.source_analyzer._numeric_props_by_domain
         for src_cls in self.source_analyzer.classes:
-            numeric_props = self.source_analyzer.get_numeric_properties(src_cls)
+            numeric_props = numeric_props_by_domain.get(src_cls, ())
 
             if len(numeric_props) >= 2:
                 # Generate a sum calculation rule
-                props_names = [
-                    self._to_snake_case(self.source_analyzer._get_local_name(p))
-                    for p in numeric_props[:2]
-                ]
+                props_names = [self.source_analyzer.snake_local[p] for p in numeric_props[:2]]
 
                 calc_rules.append({
                     'name': f'calculate_total_{props_names[0]}',
@@ -408,29 +640,35 @@ class RuleGenerator:
 
         return calc_rules
 
-    def _to_snake_case(self, name: str) -> str:
-        """Convert camelCase or PascalCase to snake_case."""
-        # Insert underscore before capitals
-        s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
-        # Insert underscore before capitals preceded by lowercase
-        s2 = re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1)
-        return s2.lower()
-
-    def _pluralize(self, word: str) -> str:
-        """Simple pluralization."""
-        if word.endswith('y'):
-            return word[:-1] + 'ies'
-        elif word.endswith('s'):
-            return word + 'es'
-        else:
-            return word + 's'
+    # String helpers kept as methods for existing callers
+    _similarity_score = staticmethod(similarity_score)
+    _to_snake_case = staticmethod(to_snake_case)
+    _pluralize = staticmethod(pluralize)
 
-    def save_rules(self, output_file: str):
-        """Save generated rules to YAML file."""
+    def save_rules_to_stream(self, stream: TextIO) -> Dict[str, Any]:
+        """
+        Generate rules and write them as YAML to a text stream.
+
+        Args:
+            stream: Writable text file-like object
+
+        Returns:
+            The generated rules dictionary
+        """
         rules = self.generate_rules()
 
+        # Dump one top-level section at a time so only that section's node
+        # tree is held by the representer while writing
+        for key, value in rules.items():
+            yaml.dump({key: value}, stream, Dumper=SafeDumper, default_flow_style=False,
+                      sort_keys=False, allow_unicode=True)
+
+        return rules
+
+    def save_rules(self, output_file: str):
+        """Save generated rules to YAML file."""
         with open(output_file, 'w', encoding='utf-8') as f:
-            yaml.dump(rules, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+            rules = self.save_rules_to_stream(f)
 
         print("\n" + "=" * 70)
         print("RULE GENERATION COMPLETE")
@@ -4,10 +4,18 @@ Test script for improved rule generation logic.
 This simulates AI suggestions and tests the improved substeps generation.
 """
 
+import os
 import yaml
 import json
 from ai_rule_generator import AIRuleGenerator
 
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+OUTPUT_FILE = "output/ai_generated_rules_v2_improved.yaml"
+
 # Mock AI suggestions based on typical response
 mock_suggestions = {
     "class_mappings": [
@@ -71,18 +79,23 @@ mock_suggestions = {
     ]
 }
 
-def test_improved_generation():
-    """Test improved rule generation with auto-substeps."""
+def test_improved_generation(output_file=None):
+    """
+    Test improved rule generation with auto-substeps.
+
+    Args:
+        output_file: Where to save the rules; defaults to OUTPUT_FILE when the
+                     SAVE_RULES environment variable is set, otherwise nothing is written
+    """
     print("=" * 70)
     print("TESTING IMPROVED RULE GENERATION")
     print("=" * 70)
 
     # Create generator instance with dummy API key (we won't call AI)
-    import os
-    os.environ['ANTHROPIC_API_KEY'] = 'test-key-not-used'
     generator = AIRuleGenerator(
         "model/source/manufacturing-ontology.ttl",
         "model/target/ghg-report-ontology.ttl",
+        api_key='test-key-not-used',
         verify_ssl=False
     )
 
@@ -150,18 +163,20 @@ def test_improved_generation():
         print(f"   - {non_empty_substeps_count} steps with substeps")
         print(f"   - {empty_substeps_count} steps with empty substeps")
 
-    # Save improved rules
-    output_file = "output/ai_generated_rules_v2_improved.yaml"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        yaml.dump(rules, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+    # Save improved rules (only on request; the rules are returned either way)
+    if output_file is None and os.environ.get('SAVE_RULES'):
+        output_file = OUTPUT_FILE
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            yaml.dump(rules, f, Dumper=SafeDumper, default_flow_style=False, sort_keys=False, allow_unicode=True)
 
-    print(f"\n💾 Saved improved rules to: {output_file}")
+        print(f"\n💾 Saved improved rules to: {output_file}")
 
     return rules, empty_substeps_count == 0
 
 if __name__ == "__main__":
     try:
-        rules, success = test_improved_generation()
+        rules, success = test_improved_generation(OUTPUT_FILE)
         exit(0 if success else 1)
     except Exception as e:
         print(f"\n❌ ERROR: {e}")
@@ -6,19 +6,156 @@ transformations in a model-agnostic manner.
 """
 
 import unittest
+import copy
 import json
-import os
+import yaml
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
 from rule_engine import RuleEngine
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+
+RULES_FILE = "transformation_rules.yaml"
+TEST_DATA_DIR = Path("test_data/source")
+TOTAL_KEYS = ("total_scope1", "total_scope2", "total_emissions")
+
+# Sample file name -> expected report values; totals are compared after
+# rounding to "places", the other keys are checked only when present
+SAMPLE_EXPECTATIONS = {
+    "sample1_small_factory.json": {
+        "places": 1,
+        "totals": {"total_scope1": 1725.5, "total_scope2": 10450.0, "total_emissions": 12175.5},
+        "organization_name": "Acme Manufacturing Ltd",
+        "reporting_period": "2024-01",
+    },
+    "sample2_multi_fuel.json": {
+        "places": 0,
+        "totals": {"total_scope1": 450055.0, "total_scope2": 22500.0, "total_emissions": 472555.0},
+        # coal, electricity, natural gas, diesel
+        "emission_count": 4,
+    },
+    "sample3_electronics.json": {
+        "places": 0,
+        "totals": {"total_scope1": 1812.0, "total_scope2": 17400.0, "total_emissions": 19212.0},
+        "organization_name": "TechElectronics Japan",
+    },
+}
+SAMPLE_FILES = tuple(SAMPLE_EXPECTATIONS)
+
+# Sample file name -> whether it exists, probed once in setUpModule
+_HAS_SAMPLE = {}
+
+
+def _totals(result: dict, places: int) -> dict:
+    """Extract the report totals rounded to the given number of places."""
+    return {key: round(result[key], places) for key in TOTAL_KEYS}
+
+
+def _energy(name: str, amount: float, unit: str) -> dict:
+    """Build one energy consumption record."""
+    return {"energy_type": {"name": name}, "amount": amount, "unit": unit}
+
+
+def _single_activity_source(org_name: str, energy_consumptions: list,
+                            activity_name: str = "Test", facility: str = "Plant",
+                            start_date: str = "2024-01-01", end_date: str = "2024-01-31") -> dict:
+    """Build manufacturing source data with one activity (A001)."""
+    return {
+        "organization": {"name": org_name},
+        "manufacturing_activities": [
+            {
+                "activity_id": "A001",
+                "activity_name": activity_name,
+                "facility": facility,
+                "start_date": start_date,
+                "end_date": end_date,
+                "energy_consumptions": energy_consumptions
+            }
+        ]
+    }
+
+
+# Shared source fixtures; RuleEngine.transform does not modify its input
+_SIMPLE_SOURCE = _single_activity_source(
+    "Test Org",
+    [_energy("electricity", 1000, "kWh")],
+    activity_name="Test Activity",
+    facility="Test Facility"
+)
+
+_SCOPE_SOURCE = _single_activity_source("Test", [
+    _energy("electricity", 100, "kWh"),
+    _energy("natural_gas", 100, "m³"),
+    _energy("diesel", 100, "liters")
+])
+
+_CALCULATION_SOURCE = _single_activity_source("Test", [
+    _energy("electricity", 2000, "kWh"),
+    _energy("natural_gas", 500, "m³")
+])
+
+_EMPTY_SOURCE = {
+    "organization": {"name": "Empty Org"},
+    "manufacturing_activities": []
+}
+
+_NO_ENERGY_SOURCE = _single_activity_source("Test", [], activity_name="Manual Work")
+
+_MIXED_CASE_SOURCE = _single_activity_source("Test", [
+    _energy("ELECTRICITY", 100, "kWh"),
+    _energy("Natural Gas", 100, "m³")
+])
+
+_REPORT_SOURCE = _single_activity_source(
+    "Global Industries Corp",
+    [],
+    start_date="2024-02-15",
+    end_date="2024-02-28"
+)
+
+
+@lru_cache(maxsize=8)
+def _load_sample_cached(filepath: Path):
+    """Read and parse a sample JSON file once per test run."""
+    return _json_loads(filepath.read_bytes())
+
+
+def setUpModule():
+    """Check which sample files are available before any test runs."""
+    for filename in SAMPLE_FILES:
+        _HAS_SAMPLE[filename] = (TEST_DATA_DIR / filename).is_file()
+
 
 class TestRuleEngine(unittest.TestCase):
     """Test the rule engine with manufacturing to GHG transformation rules."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        self.rules_file = "transformation_rules.yaml"
-        self.engine = RuleEngine(self.rules_file)
-        self.test_data_dir = "test_data/source"
+    @classmethod
+    def setUpClass(cls):
+        """Parse the rules file and build the (read-only) engine once for all tests."""
+        cls.rules_file = RULES_FILE
+        with open(cls.rules_file, 'r', encoding='utf-8') as f:
+            cls._cached_rules = yaml.load(f, Loader=SafeLoader)
+
+        cls.engine = RuleEngine.from_rules(cls._cached_rules)
+        cls.test_data_dir = TEST_DATA_DIR
+
+    def test_from_rules_matches_file(self):
+        """Test that an engine built from parsed rules matches one loaded from file."""
+        file_engine = RuleEngine(self.rules_file)
+        self.assertEqual(file_engine.rules, self.engine.rules)
+        self.assertEqual(file_engine.constants, self.engine.constants)
+        self.assertEqual(file_engine.metadata, self.engine.metadata)
+        self.assertEqual(file_engine.options, self.engine.options)
 
     def test_engine_initialization(self):
         """Test that the engine loads rules correctly."""
@@ -113,27 +250,7 @@ class TestRuleEngine(unittest.TestCase):
 
     def test_simple_transformation(self):
         """Test basic transformation with minimal data."""
-        source_data = {
-            "organization": {"name": "Test Org"},
-            "manufacturing_activities": [
-                {
-                    "activity_id": "A001",
-                    "activity_name": "Test Activity",
-                    "facility": "Test Facility",
-                    "start_date": "2024-01-01",
-                    "end_date": "2024-01-31",
-                    "energy_consumptions": [
-                        {
-                            "energy_type": {"name": "electricity"},
-                            "amount": 1000,
-                            "unit": "kWh"
-                        }
-                    ]
-                }
-            ]
-        }
-
-        result = self.engine.transform(source_data)
+        result = self.engine.transform(_SIMPLE_SOURCE)
 
         # Verify structure
         self.assertEqual(result["@type"], "ghg:EmissionReport")
@@ -150,148 +267,62 @@ class TestRuleEngine(unittest.TestCase):
         # 1000 kWh * 0.5 = 500 kg-CO2
         self.assertEqual(result["total_emissions"], 500.0)
 
-    def load_sample(self, filename):
-        """Load a sample JSON file."""
-        filepath = os.path.join(self.test_data_dir, filename)
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-
-    def test_sample1_transformation(self):
-        """Test transformation of sample1_small_factory.json."""
-        if not os.path.exists(os.path.join(self.test_data_dir, "sample1_small_factory.json")):
-            self.skipTest("Sample file not found")
-
-        source_data = self.load_sample("sample1_small_factory.json")
-        result = self.engine.transform(source_data)
+    def test_transform_does_not_modify_source(self):
+        """Test that transform leaves its input untouched (fixtures are shared)."""
+        before = copy.deepcopy(_SCOPE_SOURCE)
+        self.engine.transform(_SCOPE_SOURCE)
+        self.assertEqual(_SCOPE_SOURCE, before)
 
-        # Verify totals
-        self.assertAlmostEqual(result["total_scope1"], 1725.5, places=1)
-        self.assertAlmostEqual(result["total_scope2"], 10450.0, places=1)
-        self.assertAlmostEqual(result["total_emissions"], 12175.5, places=1)
-
-        # Verify organization
-        self.assertEqual(
-            result["reporting_organization"]["organization_name"],
-            "Acme Manufacturing Ltd"
-        )
-
-        # Verify reporting period
-        self.assertEqual(result["reporting_period"], "2024-01")
-
-    def test_sample2_transformation(self):
-        """Test transformation of sample2_multi_fuel.json."""
-        if not os.path.exists(os.path.join(self.test_data_dir, "sample2_multi_fuel.json")):
-            self.skipTest("Sample file not found")
-
-        source_data = self.load_sample("sample2_multi_fuel.json")
-        result = self.engine.transform(source_data)
+    def load_sample(self, filename):
+        """Load a sample JSON file (a private copy of the cached parse)."""
+        return copy.deepcopy(_load_sample_cached(self.test_data_dir / filename))
 
-        # Verify totals
-        self.assertAlmostEqual(result["total_scope1"], 450055.0, places=0)
-        self.assertAlmostEqual(result["total_scope2"], 22500.0, places=0)
-        self.assertAlmostEqual(result["total_emissions"], 472555.0, places=0)
+    def test_sample_transformations(self):
+        """Test transformation of each sample file against its expected report values."""
+        for filename, expected in SAMPLE_EXPECTATIONS.items():
+            with self.subTest(sample=filename):
+                if not _HAS_SAMPLE[filename]:
+                    self.skipTest("Sample file not found")
 
-        # Verify emissions count (should have 4 emissions: coal, electricity, natural gas, diesel)
-        self.assertEqual(len(result["emissions"]), 4)
+                source_data = self.load_sample(filename)
+                result = self.engine.transform(source_data)
 
-    def test_sample3_transformation(self):
-        """Test transformation of sample3_electronics.json."""
-        if not os.path.exists(os.path.join(self.test_data_dir, "sample3_electronics.json")):
-            self.skipTest("Sample file not found")
+                # Verify totals
+                self.assertEqual(_totals(result, expected["places"]), expected["totals"])
 
-        source_data = self.load_sample("sample3_electronics.json")
-        result = self.engine.transform(source_data)
+                # Verify organization
+                if "organization_name" in expected:
+                    self.assertEqual(
+                        result["reporting_organization"]["organization_name"],
+                        expected["organization_name"]
+                    )
 
-        # Verify totals
-        self.assertAlmostEqual(result["total_scope1"], 1812.0, places=0)
-        self.assertAlmostEqual(result["total_scope2"], 17400.0, places=0)
-        self.assertAlmostEqual(result["total_emissions"], 19212.0, places=0)
+                # Verify reporting period
+                if "reporting_period" in expected:
+                    self.assertEqual(result["reporting_period"], expected["reporting_period"])
 
-        # Verify organization
-        self.assertEqual(
-            result["reporting_organization"]["organization_name"],
-            "TechElectronics Japan"
-        )
+                # Verify emissions count
+                if "emission_count" in expected:
+                    self.assertEqual(len(result["emissions"]), expected["emission_count"])
 
     def test_scope_classification(self):
         """Test that energy types are correctly classified into scopes."""
-        source_data = {
-            "organization": {"name": "Test"},
-            "manufacturing_activities": [
-                {
-                    "activity_id": "A001",
-                    "activity_name": "Test",
-                    "facility": "Plant",
-                    "start_date": "2024-01-01",
-                    "end_date": "2024-01-31",
-                    "energy_consumptions": [
-                        {
-                            "energy_type": {"name": "electricity"},
-                            "amount": 100,
-                            "unit": "kWh"
-                        },
-                        {
-                            "energy_type": {"name": "natural_gas"},
-                            "amount": 100,
-                            "unit": "m³"
-                        },
-                        {
-                            "energy_type": {"name": "diesel"},
-                            "amount": 100,
-                            "unit": "liters"
-                        }
-                    ]
-                }
-            ]
-        }
-
-        result = self.engine.transform(source_data)
+        result = self.engine.transform(_SCOPE_SOURCE)
 
         # Check scope classification
-        scope1_emissions = [e for e in result["emissions"] if e["@type"] == "ghg:Scope1Emission"]
-        scope2_emissions = [e for e in result["emissions"] if e["@type"] == "ghg:Scope2Emission"]
+        type_counts = Counter(e["@type"] for e in result["emissions"])
 
-        self.assertEqual(len(scope1_emissions), 2)  # natural_gas and diesel
-        self.assertEqual(len(scope2_emissions), 1)  # electricity
+        self.assertEqual(type_counts["ghg:Scope1Emission"], 2)  # natural_gas and diesel
+        self.assertEqual(type_counts["ghg:Scope2Emission"], 1)  # electricity
 
     def test_emission_calculations(self):
         """Test that emission calculations are correct."""
-        source_data = {
-            "organization": {"name": "Test"},
-            "manufacturing_activities": [
-                {
-                    "activity_id": "A001",
-                    "activity_name": "Test",
-                    "facility": "Plant",
-                    "start_date": "2024-01-01",
-                    "end_date": "2024-01-31",
-                    "energy_consumptions": [
-                        {
-                            "energy_type": {"name": "electricity"},
-                            "amount": 2000,
-                            "unit": "kWh"
-                        },
-                        {
-                            "energy_type": {"name": "natural_gas"},
-                            "amount": 500,
-                            "unit": "m³"
-                        }
-                    ]
-                }
-            ]
-        }
-
-        result = self.engine.transform(source_data)
+        result = self.engine.transform(_CALCULATION_SOURCE)
 
         # Find specific emissions
-        electricity_emission = next(
-            e for e in result["emissions"]
-            if e["source_category"] == "electricity"
-        )
-        gas_emission = next(
-            e for e in result["emissions"]
-            if e["source_category"] == "natural_gas"
-        )
+        by_category = {e["source_category"]: e for e in result["emissions"]}
+        electricity_emission = by_category["electricity"]
+        gas_emission = by_category["natural_gas"]
 
         # Verify calculations
         # Electricity: 2000 * 0.5 = 1000
@@ -304,65 +335,21 @@ class TestRuleEngine(unittest.TestCase):
 
     def test_empty_activities(self):
         """Test handling of empty activities."""
-        source_data = {
-            "organization": {"name": "Empty Org"},
-            "manufacturing_activities": []
-        }
-
-        result = self.engine.transform(source_data)
+        result = self.engine.transform(_EMPTY_SOURCE)
 
         self.assertEqual(result["total_emissions"], 0.0)
         self.assertEqual(len(result["emissions"]), 0)
 
     def test_activity_without_energy(self):
         """Test activity with no energy consumption."""
-        source_data = {
-            "organization": {"name": "Test"},
-            "manufacturing_activities": [
-                {
-                    "activity_id": "A001",
-                    "activity_name": "Manual Work",
-                    "facility": "Plant",
-                    "start_date": "2024-01-01",
-                    "end_date": "2024-01-31",
-                    "energy_consumptions": []
-                }
-            ]
-        }
-
-        result = self.engine.transform(source_data)
+        result = self.engine.transform(_NO_ENERGY_SOURCE)
 
         self.assertEqual(result["total_emissions"], 0.0)
         self.assertEqual(len(result["emissions"]), 0)
 
     def test_case_insensitive_energy_types(self):
         """Test that energy type names are case-insensitive."""
-        source_data = {
-            "organization": {"name": "Test"},
-            "manufacturing_activities": [
-                {
-                    "activity_id": "A001",
-                    "activity_name": "Test",
-                    "facility": "Plant",
-                    "start_date": "2024-01-01",
-                    "end_date": "2024-01-31",
-                    "energy_consumptions": [
-                        {
-                            "energy_type": {"name": "ELECTRICITY"},
-                            "amount": 100,
-                            "unit": "kWh"
-                        },
-                        {
-                            "energy_type": {"name": "Natural Gas"},
-                            "amount": 100,
-                            "unit": "m³"
-                        }
-                    ]
-                }
-            ]
-        }
-
-        result = self.engine.transform(source_data)
+        result = self.engine.transform(_MIXED_CASE_SOURCE)
 
         # Should have 2 emissions
         self.assertEqual(len(result["emissions"]), 2)
@@ -374,21 +361,7 @@ class TestRuleEngine(unittest.TestCase):
 
     def test_report_metadata(self):
         """Test report metadata generation."""
-        source_data = {
-            "organization": {"name": "Global Industries Corp"},
-            "manufacturing_activities": [
-                {
-                    "activity_id": "A001",
-                    "activity_name": "Test",
-                    "facility": "Plant",
-                    "start_date": "2024-02-15",
-                    "end_date": "2024-02-28",
-                    "energy_consumptions": []
-                }
-            ]
-        }
-
-        result = self.engine.transform(source_data)
+        result = self.engine.transform(_REPORT_SOURCE)
 
         # Check report ID
         self.assertIn("GHG-", result["report_id"])
@@ -421,4 +394,9 @@ def run_all_tests():
 
 
 if __name__ == "__main__":
+    import sys
+
+    if '--parallel' in sys.argv:
+        from parallel_test_runner import run_tests_parallel
+        sys.exit(run_tests_parallel(__file__, run_all_tests))
     run_all_tests()
@@ -8,19 +8,61 @@ Tests the complete MDA pipeline:
 """
 
 import unittest
+import io
 import os
 import json
 import yaml
-from rule_generator import RuleGenerator, OntologyAnalyzer
+from functools import lru_cache
+from rule_generator import (
+    RuleGenerator, OntologyAnalyzer, similarity_score, to_snake_case, pluralize
+)
 from rule_engine import RuleEngine
 
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+
+MANUFACTURING_ONTOLOGY = "model/source/manufacturing-ontology.ttl"
+GHG_REPORT_ONTOLOGY = "model/target/ghg-report-ontology.ttl"
+VEHICLE_FLEET_ONTOLOGY = "model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl"
+FLEET_EMISSIONS_ONTOLOGY = "model_examples/vehicle_fleet/fleet-emissions-ontology.ttl"
+
+# Whether the optional vehicle fleet example exists, probed once in setUpModule
+_HAS_FLEET = False
+
+
+def setUpModule():
+    """Check for optional example files before any test runs."""
+    global _HAS_FLEET
+    _HAS_FLEET = os.path.exists(VEHICLE_FLEET_ONTOLOGY)
+
+
+# Analyzers and generators are read-only once built, so tests share them
+@lru_cache(maxsize=16)
+def _get_analyzer(ontology_file: str) -> OntologyAnalyzer:
+    """Parse and analyze an ontology once per test run."""
+    return OntologyAnalyzer(ontology_file)
+
+
+@lru_cache(maxsize=16)
+def _get_generator(source_ontology: str, target_ontology: str) -> RuleGenerator:
+    """Build a rule generator once per (source, target) pair, reusing the cached analyzers."""
+    return RuleGenerator(
+        source_ontology,
+        target_ontology,
+        source_analyzer=_get_analyzer(source_ontology),
+        target_analyzer=_get_analyzer(target_ontology)
+    )
+
 
 class TestOntologyAnalyzer(unittest.TestCase):
     """Test ontology parsing and analysis."""
 
     def test_load_manufacturing_ontology(self):
         """Test loading manufacturing ontology."""
-        analyzer = OntologyAnalyzer("model/source/manufacturing-ontology.ttl")
+        analyzer = _get_analyzer(MANUFACTURING_ONTOLOGY)
 
         self.assertIsNotNone(analyzer.graph)
         self.assertGreater(len(analyzer.classes), 0)
@@ -28,7 +70,7 @@ class TestOntologyAnalyzer(unittest.TestCase):
 
     def test_load_ghg_ontology(self):
         """Test loading GHG ontology."""
-        analyzer = OntologyAnalyzer("model/target/ghg-report-ontology.ttl")
+        analyzer = _get_analyzer(GHG_REPORT_ONTOLOGY)
 
         self.assertIsNotNone(analyzer.graph)
         self.assertGreater(len(analyzer.classes), 0)
@@ -36,14 +78,14 @@ class TestOntologyAnalyzer(unittest.TestCase):
 
     def test_extract_namespace(self):
         """Test namespace extraction."""
-        analyzer = OntologyAnalyzer("model/source/manufacturing-ontology.ttl")
+        analyzer = _get_analyzer(MANUFACTURING_ONTOLOGY)
 
         self.assertIsNotNone(analyzer.namespace)
         self.assertIn("manufacturing", analyzer.namespace)
 
     def test_get_class_properties(self):
         """Test getting properties of a class."""
-        analyzer = OntologyAnalyzer("model/source/manufacturing-ontology.ttl")
+        analyzer = _get_analyzer(MANUFACTURING_ONTOLOGY)
 
         # Find a class
         if analyzer.classes:
@@ -53,12 +95,106 @@ class TestOntologyAnalyzer(unittest.TestCase):
             # Should return a list (may be empty)
             self.assertIsInstance(props, list)
 
+    def test_get_label_prefers_english_then_any_language(self):
+        """Test that English labels are preferred and other languages are used as a fallback."""
+        import tempfile
+
+        turtle = """
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix ex: <http://example.org/test#> .
+
+ex:C1 a owl:Class ; rdfs:label "車両"@ja .
+ex:C2 a owl:Class ; rdfs:label "Fuel Record"@en-US .
+ex:C3 a owl:Class .
+ex:C4 a owl:Class ; rdfs:label "燃料"@ja , "Fuel"@en .
+"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ontology_file = os.path.join(temp_dir, "labels.ttl")
+            with open(ontology_file, "w", encoding="utf-8") as f:
+                f.write(turtle)
+            analyzer = OntologyAnalyzer(ontology_file)
+
+        labels = {analyzer._get_local_name(cls): analyzer.get_label(cls) for cls in analyzer.classes}
+        self.assertEqual(labels, {"C1": "車両", "C2": "Fuel Record", "C3": "C3", "C4": "Fuel"})
+
+    def test_label_tokens_cached(self):
+        """Test that labels are tokenized once per resource."""
+        analyzer = _get_analyzer(MANUFACTURING_ONTOLOGY)
+
+        expected = {
+            "EnergyConsumption": ("energy consumption", {"energy", "consumption"}),
+            "ManufacturingActivity": ("manufacturing activity", {"manufacturing", "activity"}),
+            "Product": ("product", {"product"}),
+            "activityId": ("activity id", {"activity", "id"}),
+            "energyTypeName": ("energy type name", {"energy", "type", "name"}),
+        }
+        resources = {
+            analyzer._get_local_name(resource): resource
+            for resource in list(analyzer.classes) + list(analyzer.properties)
+        }
+        for name, (lower, tokens) in expected.items():
+            with self.subTest(resource=name):
+                resource = resources[name]
+                self.assertEqual(analyzer._lower_labels[resource], lower)
+                self.assertIsInstance(analyzer._tokens[resource], frozenset)
+                self.assertEqual(analyzer._tokens[resource], tokens)
+
+    def test_load_with_ntriples_cache(self):
+        """Test that load() writes an N-Triples cache and parses it instead of the Turtle file."""
+        import shutil
+        import tempfile
+        from unittest.mock import patch
+        from rdflib import Graph
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ontology_file = os.path.join(temp_dir, "manufacturing-ontology.ttl")
+            shutil.copy(MANUFACTURING_ONTOLOGY, ontology_file)
+
+            with patch.object(Graph, "parse", autospec=True, side_effect=Graph.parse) as parse:
+                first = OntologyAnalyzer.load(ontology_file)
+                self.assertTrue(os.path.exists(ontology_file + ".cache.nt"))
+
+                parse.reset_mock()
+                second = OntologyAnalyzer.load(ontology_file)
+                self.assertEqual([c.kwargs["format"] for c in parse.call_args_list], ["nt"])
+                self.assertEqual(parse.call_args.args[1], ontology_file + ".cache.nt")
+
+            self.assertEqual(second.classes, first.classes)
+            self.assertEqual(second.properties, first.properties)
+            self.assertEqual(second.namespace, first.namespace)
+            for cls in first.classes:
+                self.assertEqual(second.get_label(cls), first.get_label(cls))
+            self.assertEqual(
+                [name for name in os.listdir(temp_dir) if name.endswith(".tmp")], []
+            )
+
+    def test_ntriples_cache_invalidated_by_changed_source(self):
+        """Test that a cache is rebuilt when the ontology changes, even if its mtime goes back."""
+        import shutil
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ontology_file = os.path.join(temp_dir, "manufacturing-ontology.ttl")
+            shutil.copy(MANUFACTURING_ONTOLOGY, ontology_file)
+            OntologyAnalyzer.load(ontology_file)
+
+            # Add a class, then backdate the file as 'cp -p' or rsync would
+            with open(ontology_file, "a", encoding="utf-8") as f:
+                f.write("\n<http://example.org/test#AddedClass> a "
+                        "<http://www.w3.org/2002/07/owl#Class> .\n")
+            old_time = os.stat(ontology_file + ".cache.nt").st_mtime - 3600
+            os.utime(ontology_file, (old_time, old_time))
+
+            reloaded = OntologyAnalyzer.load(ontology_file)
+            self.assertIn("http://example.org/test#AddedClass", {str(c) for c in reloaded.classes})
+
     def test_load_vehicle_fleet_ontology(self):
         """Test loading vehicle fleet ontology."""
-        if not os.path.exists("model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl"):
+        if not _HAS_FLEET:
             self.skipTest("Vehicle fleet ontology not found")
 
-        analyzer = OntologyAnalyzer("model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl")
+        analyzer = _get_analyzer(VEHICLE_FLEET_ONTOLOGY)
 
         self.assertIsNotNone(analyzer.graph)
         self.assertGreater(len(analyzer.classes), 0)
@@ -70,9 +206,9 @@ class TestRuleGenerator(unittest.TestCase):
 
     def test_generate_rules_manufacturing_to_ghg(self):
         """Test rule generation for manufacturing to GHG transformation."""
-        generator = RuleGenerator(
-            "model/source/manufacturing-ontology.ttl",
-            "model/target/ghg-report-ontology.ttl"
+        generator = _get_generator(
+            MANUFACTURING_ONTOLOGY,
+            GHG_REPORT_ONTOLOGY
         )
 
         rules = generator.generate_rules("Manufacturing to GHG Test")
@@ -93,14 +229,24 @@ class TestRuleGenerator(unittest.TestCase):
         self.assertGreaterEqual(len(generator.class_mappings), 0)
         print(f"  Manufacturing->GHG class mappings: {len(generator.class_mappings)}")
 
+    def test_generator_reuses_given_analyzers(self):
+        """Test that injected analyzers are used as-is and give the same mappings as parsing."""
+        generator = _get_generator(MANUFACTURING_ONTOLOGY, GHG_REPORT_ONTOLOGY)
+        self.assertIs(generator.source_analyzer, _get_analyzer(MANUFACTURING_ONTOLOGY))
+        self.assertIs(generator.target_analyzer, _get_analyzer(GHG_REPORT_ONTOLOGY))
+
+        parsed = RuleGenerator(MANUFACTURING_ONTOLOGY, GHG_REPORT_ONTOLOGY)
+        self.assertEqual(generator.class_mappings, parsed.class_mappings)
+        self.assertEqual(generator.property_mappings, parsed.property_mappings)
+
     def test_generate_rules_vehicle_fleet(self):
         """Test rule generation for vehicle fleet to emissions."""
-        if not os.path.exists("model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl"):
+        if not _HAS_FLEET:
             self.skipTest("Vehicle fleet ontology not found")
 
-        generator = RuleGenerator(
-            "model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl",
-            "model_examples/vehicle_fleet/fleet-emissions-ontology.ttl"
+        generator = _get_generator(
+            VEHICLE_FLEET_ONTOLOGY,
+            FLEET_EMISSIONS_ONTOLOGY
         )
 
         rules = generator.generate_rules("Vehicle Fleet to Emissions")
@@ -118,9 +264,9 @@ class TestRuleGenerator(unittest.TestCase):
 
     def test_class_mapping_inference(self):
         """Test that class mappings are inferred correctly."""
-        generator = RuleGenerator(
-            "model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl",
-            "model_examples/vehicle_fleet/fleet-emissions-ontology.ttl"
+        generator = _get_generator(
+            VEHICLE_FLEET_ONTOLOGY,
+            FLEET_EMISSIONS_ONTOLOGY
         )
 
         # Should find Vehicle -> VehicleEmission mapping
@@ -129,43 +275,71 @@ class TestRuleGenerator(unittest.TestCase):
 
     def test_property_mapping_inference(self):
         """Test that property mappings are inferred correctly."""
-        generator = RuleGenerator(
-            "model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl",
-            "model_examples/vehicle_fleet/fleet-emissions-ontology.ttl"
+        generator = _get_generator(
+            VEHICLE_FLEET_ONTOLOGY,
+            FLEET_EMISSIONS_ONTOLOGY
         )
 
         # Should find some property mappings
         total_props = sum(len(v) for v in generator.property_mappings.values())
         self.assertGreater(total_props, 0)
 
-    def test_save_rules(self):
-        """Test saving rules to YAML file."""
-        import tempfile
+    def test_root_class_not_used_as_range(self):
+        """Test that the root target class is never the range of a property."""
+        generator = _get_generator(
+            VEHICLE_FLEET_ONTOLOGY,
+            FLEET_EMISSIONS_ONTOLOGY
+        )
 
-        generator = RuleGenerator(
-            "model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl",
-            "model_examples/vehicle_fleet/fleet-emissions-ontology.ttl"
+        root_name = generator._get_root_class_name()
+        self.assertTrue(root_name.startswith("target:"))
+
+        range_names = {
+            generator.target_analyzer._get_local_name(info['range'])
+            for info in generator.target_analyzer.properties.values()
+            if info['range'] is not None
+        }
+        self.assertNotIn(root_name.split(":", 1)[1], range_names)
+
+    def test_save_rules(self):
+        """Test saving rules as YAML."""
+        generator = _get_generator(
+            VEHICLE_FLEET_ONTOLOGY,
+            FLEET_EMISSIONS_ONTOLOGY
         )
 
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-            temp_file = f.name
+        buf = io.StringIO()
+        rules = generator.save_rules_to_stream(buf)
+
+        # Verify the output is valid YAML for the returned rules
+        buf.seek(0)
+        loaded_rules = yaml.load(buf, Loader=SafeLoader)
 
-        try:
-            generator.save_rules(temp_file)
+        self.assertIsInstance(loaded_rules, dict)
+        self.assertIn('metadata', loaded_rules)
+        self.assertEqual(loaded_rules, rules)
 
-            # Verify file was created and is valid YAML
-            self.assertTrue(os.path.exists(temp_file))
+    def test_save_rules_to_file(self):
+        """Test saving rules to a YAML file and loading them back."""
+        import tempfile
+        from contextlib import redirect_stdout
+
+        generator = _get_generator(
+            VEHICLE_FLEET_ONTOLOGY,
+            FLEET_EMISSIONS_ONTOLOGY
+        )
 
-            with open(temp_file, 'r') as f:
-                loaded_rules = yaml.safe_load(f)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = os.path.join(temp_dir, "rules.yaml")
+            with redirect_stdout(io.StringIO()):
+                generator.save_rules(output_file)
 
-            self.assertIsInstance(loaded_rules, dict)
-            self.assertIn('metadata', loaded_rules)
+            with open(output_file, encoding="utf-8") as f:
+                loaded_rules = yaml.load(f, Loader=SafeLoader)
 
-        finally:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        self.assertIsInstance(loaded_rules, dict)
+        self.assertIn('metadata', loaded_rules)
+        self.assertEqual(loaded_rules, generator.generate_rules())
 
 
 class TestEndToEndPipeline(unittest.TestCase):
@@ -174,42 +348,33 @@ class TestEndToEndPipeline(unittest.TestCase):
     def test_manufacturing_pipeline(self):
         """Test complete pipeline with manufacturing ontologies."""
         # Step 1: Generate rules from ontologies
-        generator = RuleGenerator(
-            "model/source/manufacturing-ontology.ttl",
-            "model/target/ghg-report-ontology.ttl"
+        generator = _get_generator(
+            MANUFACTURING_ONTOLOGY,
+            GHG_REPORT_ONTOLOGY
         )
 
         rules = generator.generate_rules("Test Manufacturing Transformation")
 
-        # Step 2: Save rules to temporary file
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-            yaml.dump(rules, f)
-            rules_file = f.name
-
-        try:
-            # Verify rules file is valid
-            with open(rules_file, 'r') as f:
-                loaded_rules = yaml.safe_load(f)
-
-            self.assertIsInstance(loaded_rules, dict)
-            self.assertIn('metadata', loaded_rules)
+        # Step 2: Serialize rules and verify they round-trip as YAML
+        buf = io.StringIO()
+        yaml.dump(rules, buf, Dumper=SafeDumper)
+        buf.seek(0)
+        loaded_rules = yaml.load(buf, Loader=SafeLoader)
 
-            print(f"\n  Generated rules with {len(generator.class_mappings)} class mappings")
+        self.assertIsInstance(loaded_rules, dict)
+        self.assertIn('metadata', loaded_rules)
 
-        finally:
-            if os.path.exists(rules_file):
-                os.remove(rules_file)
+        print(f"\n  Generated rules with {len(generator.class_mappings)} class mappings")
 
     def test_vehicle_fleet_pipeline(self):
         """Test complete pipeline with vehicle fleet ontologies."""
-        if not os.path.exists("model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl"):
+        if not _HAS_FLEET:
             self.skipTest("Vehicle fleet ontology not found")
 
         # Step 1: Generate rules
-        generator = RuleGenerator(
-            "model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl",
-            "model_examples/vehicle_fleet/fleet-emissions-ontology.ttl"
+        generator = _get_generator(
+            VEHICLE_FLEET_ONTOLOGY,
+            FLEET_EMISSIONS_ONTOLOGY
         )
 
         rules = generator.generate_rules("Vehicle Fleet Transformation")
@@ -229,59 +394,68 @@ class TestRuleGeneratorFeatures(unittest.TestCase):
 
     def test_similarity_scoring(self):
         """Test the similarity scoring algorithm."""
-        generator = RuleGenerator(
-            "model/source/manufacturing-ontology.ttl",
-            "model/target/ghg-report-ontology.ttl"
-        )
-
         # Exact match
-        score = generator._similarity_score("organization", "organization")
+        score = similarity_score("organization", "organization")
         self.assertEqual(score, 1.0)
 
         # Similar words
-        score = generator._similarity_score("manufacturing activity", "emission")
+        score = similarity_score("manufacturing activity", "emission")
         self.assertGreaterEqual(score, 0.0)
         self.assertLessEqual(score, 1.0)
 
         # Substring match
-        score = generator._similarity_score("organization", "reporting organization")
+        score = similarity_score("organization", "reporting organization")
         self.assertGreater(score, 0.5)
 
-    def test_snake_case_conversion(self):
-        """Test camelCase to snake_case conversion."""
-        generator = RuleGenerator(
-            "model/source/manufacturing-ontology.ttl",
-            "model/target/ghg-report-ontology.ttl"
+    def test_token_masks_share_vocabulary(self):
+        """Test that source and target token bitmasks use one vocabulary."""
+        generator = _get_generator(
+            VEHICLE_FLEET_ONTOLOGY,
+            FLEET_EMISSIONS_ONTOLOGY
         )
 
-        self.assertEqual(generator._to_snake_case("activityId"), "activity_id")
-        self.assertEqual(generator._to_snake_case("ManufacturingActivity"), "manufacturing_activity")
+        for analyzer, masks in ((generator.source_analyzer, generator._source_masks),
+                                (generator.target_analyzer, generator._target_masks)):
+            for resource, tokens in analyzer._tokens.items():
+                expected = sum(1 << generator._token_vocab[t] for t in tokens)
+                self.assertEqual(masks[resource], expected)
+
+    def test_snake_case_conversion(self):
+        """Test camelCase to snake_case conversion."""
+        self.assertEqual(to_snake_case("activityId"), "activity_id")
+        self.assertEqual(to_snake_case("ManufacturingActivity"), "manufacturing_activity")
         # CO2Amount becomes co2_amount (not c_o2_amount) which is acceptable
-        self.assertEqual(generator._to_snake_case("CO2Amount"), "co2_amount")
+        self.assertEqual(to_snake_case("CO2Amount"), "co2_amount")
 
     def test_pluralization(self):
         """Test simple pluralization."""
-        generator = RuleGenerator(
-            "model/source/manufacturing-ontology.ttl",
-            "model/target/ghg-report-ontology.ttl"
-        )
+        self.assertEqual(pluralize("activity"), "activities")
+        self.assertEqual(pluralize("emission"), "emissions")
+        self.assertEqual(pluralize("class"), "classes")
 
-        self.assertEqual(generator._pluralize("activity"), "activities")
-        self.assertEqual(generator._pluralize("emission"), "emissions")
-        self.assertEqual(generator._pluralize("class"), "classes")
+    def test_helper_methods_delegate_to_module_functions(self):
+        """Test that the RuleGenerator helper methods remain available."""
+        self.assertEqual(RuleGenerator._to_snake_case("activityId"), "activity_id")
+        self.assertEqual(RuleGenerator._pluralize("activity"), "activities")
+        self.assertEqual(RuleGenerator._similarity_score("organization", "organization"), 1.0)
 
 
 class TestGeneratedRulesQuality(unittest.TestCase):
     """Test the quality of generated rules."""
 
-    def test_generated_rules_completeness(self):
-        """Test that generated rules contain all necessary sections."""
-        generator = RuleGenerator(
-            "model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl",
-            "model_examples/vehicle_fleet/fleet-emissions-ontology.ttl"
+    @classmethod
+    def setUpClass(cls):
+        """Generate the vehicle fleet rules once for all quality checks."""
+        generator = _get_generator(
+            VEHICLE_FLEET_ONTOLOGY,
+            FLEET_EMISSIONS_ONTOLOGY
         )
+        cls.rules_default = generator.generate_rules()
+        cls.rules_named = generator.generate_rules("Test Transformation")
 
-        rules = generator.generate_rules()
+    def test_generated_rules_completeness(self):
+        """Test that generated rules contain all necessary sections."""
+        rules = self.rules_default
 
         # Required sections
         required_sections = [
@@ -298,12 +472,7 @@ class TestGeneratedRulesQuality(unittest.TestCase):
 
     def test_generated_rules_metadata(self):
         """Test that metadata is properly generated."""
-        generator = RuleGenerator(
-            "model_examples/vehicle_fleet/vehicle-fleet-ontology.ttl",
-            "model_examples/vehicle_fleet/fleet-emissions-ontology.ttl"
-        )
-
-        rules = generator.generate_rules("Test Transformation")
+        rules = self.rules_named
 
         metadata = rules['metadata']
         self.assertEqual(metadata['name'], "Test Transformation")
@@ -342,4 +511,9 @@ def run_all_tests():
 
 
 if __name__ == "__main__":
+    import sys
+
+    if '--parallel' in sys.argv:
+        from parallel_test_runner import run_tests_parallel
+        sys.exit(run_tests_parallel(__file__, run_all_tests))
     run_all_tests()
@@ -6,10 +6,24 @@ ontology to GHG emission report ontology.
 """
 
 import unittest
-import json
+import copy
+import io
 import os
+import tempfile
+from contextlib import redirect_stdout
 from decimal import Decimal
-from transformer import ManufacturingToGHGTransformer, EmissionFactors
+from pathlib import Path
+from transformer import (
+    ManufacturingToGHGTransformer, EmissionFactors, normalize_energy_type,
+    transform_file, transform_files, _loads
+)
+
+
+SAMPLE_FILES = (
+    "sample1_small_factory.json",
+    "sample2_multi_fuel.json",
+    "sample3_electronics.json",
+)
 
 
 class TestEmissionFactors(unittest.TestCase):
@@ -56,13 +70,29 @@ class TestEmissionFactors(unittest.TestCase):
         scope = EmissionFactors.get_scope("diesel")
         self.assertEqual(scope, 1)
 
+    def test_normalized_lookups(self):
+        """Test that normalized-key lookups match the name-based ones."""
+        key = normalize_energy_type("Natural Gas")
+        self.assertEqual(key, "natural_gas")
+        self.assertEqual(EmissionFactors.get_factor_normalized(key), EmissionFactors.get_factor("Natural Gas"))
+        self.assertEqual(EmissionFactors.get_scope_normalized(key), EmissionFactors.get_scope("Natural Gas"))
+
+    def test_get_info_matches_separate_lookups(self):
+        """Test that the fused factor/scope lookup agrees with get_factor and get_scope."""
+        for energy_type in list(EmissionFactors.FACTORS) + ["Natural Gas", "unknown_fuel"]:
+            self.assertEqual(
+                EmissionFactors.get_info(energy_type),
+                (EmissionFactors.get_factor(energy_type), EmissionFactors.get_scope(energy_type))
+            )
+
 
 class TestTransformer(unittest.TestCase):
     """Test the main transformation logic."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        self.transformer = ManufacturingToGHGTransformer()
+    @classmethod
+    def setUpClass(cls):
+        """Build the (stateless) transformer once for all tests."""
+        cls.transformer = ManufacturingToGHGTransformer()
 
     def test_simple_transformation(self):
         """Test basic transformation with single activity."""
@@ -244,24 +274,44 @@ class TestTransformer(unittest.TestCase):
         self.assertEqual(result["total_emissions"], 0.0)
         self.assertEqual(len(result["emissions"]), 0)
 
+    def test_context_not_shared_between_reports(self):
+        """Test that mutating one report's @context does not affect later reports."""
+        source_data = {
+            "organization": {"name": "Empty Org"},
+            "manufacturing_activities": []
+        }
+
+        first = self.transformer.transform(source_data)
+        first["@context"]["extra"] = "http://example.org/extra#"
+
+        second = self.transformer.transform(source_data)
+        self.assertNotIn("extra", second["@context"])
+        self.assertEqual(second["@context"]["ghg"], "http://example.org/ghg-report#")
+
 
 class TestIntegrationWithSampleData(unittest.TestCase):
     """Integration tests using sample data files."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        self.transformer = ManufacturingToGHGTransformer()
-        self.test_data_dir = "test_data/source"
+    @classmethod
+    def setUpClass(cls):
+        """Build the (stateless) transformer and parse the available sample files once."""
+        cls.transformer = ManufacturingToGHGTransformer()
+        cls.test_data_dir = "test_data/source"
+
+        # Sample file name -> parsed data, for the files that exist
+        cls._samples = {}
+        for filename in SAMPLE_FILES:
+            filepath = Path(cls.test_data_dir, filename)
+            if filepath.is_file():
+                cls._samples[filename] = _loads(filepath.read_bytes())
 
     def load_sample(self, filename):
-        """Load a sample JSON file."""
-        filepath = os.path.join(self.test_data_dir, filename)
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """Load a sample JSON file (a private copy of the parse done in setUpClass)."""
+        return copy.deepcopy(self._samples[filename])
 
     def test_sample1_small_factory(self):
         """Test transformation of sample1_small_factory.json."""
-        if not os.path.exists(os.path.join(self.test_data_dir, "sample1_small_factory.json")):
+        if "sample1_small_factory.json" not in self._samples:
             self.skipTest("Sample file not found")
 
         source_data = self.load_sample("sample1_small_factory.json")
@@ -292,7 +342,7 @@ class TestIntegrationWithSampleData(unittest.TestCase):
 
     def test_sample2_multi_fuel(self):
         """Test transformation of sample2_multi_fuel.json."""
-        if not os.path.exists(os.path.join(self.test_data_dir, "sample2_multi_fuel.json")):
+        if "sample2_multi_fuel.json" not in self._samples:
             self.skipTest("Sample file not found")
 
         source_data = self.load_sample("sample2_multi_fuel.json")
@@ -322,7 +372,7 @@ class TestIntegrationWithSampleData(unittest.TestCase):
 
     def test_sample3_electronics(self):
         """Test transformation of sample3_electronics.json."""
-        if not os.path.exists(os.path.join(self.test_data_dir, "sample3_electronics.json")):
+        if "sample3_electronics.json" not in self._samples:
             self.skipTest("Sample file not found")
 
         source_data = self.load_sample("sample3_electronics.json")
@@ -343,13 +393,58 @@ class TestIntegrationWithSampleData(unittest.TestCase):
         self.assertAlmostEqual(result["total_scope2"], 17400.0, places=0)
         self.assertAlmostEqual(result["total_emissions"], 19212.0, places=0)
 
+    def test_transform_files_matches_transform_file(self):
+        """Test that batch transformation writes the same files as one-by-one transformation."""
+        names = [name for name in SAMPLE_FILES if name in self._samples]
+        if not names:
+            self.skipTest("Sample files not found")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pairs = [
+                (os.path.join(self.test_data_dir, name), os.path.join(temp_dir, "batch_" + name))
+                for name in names
+            ]
+            reports = transform_files(pairs, workers=2)
+
+            self.assertEqual(len(reports), len(names))
+            for name, (input_path, output_path), report in zip(names, pairs, reports):
+                single_path = os.path.join(temp_dir, "single_" + name)
+                transform_file(input_path, single_path)
+
+                expected = self.transformer.transform(self.load_sample(name))
+                self.assertEqual(report["total_emissions"], expected["total_emissions"])
+                self.assertEqual(Path(output_path).read_bytes(), Path(single_path).read_bytes())
+
+    def test_transform_files_accepts_generator(self):
+        """Test that a one-shot iterable of pairs is transformed and summarized in order."""
+        names = [name for name in SAMPLE_FILES if name in self._samples]
+        if not names:
+            self.skipTest("Sample files not found")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pairs = (
+                (os.path.join(self.test_data_dir, name), os.path.join(temp_dir, name))
+                for name in names
+            )
+            output = io.StringIO()
+            with redirect_stdout(output):
+                reports = transform_files(pairs, workers=2)
+
+            self.assertEqual(len(reports), len(names))
+            summaries = [line for line in output.getvalue().splitlines()
+                         if line.startswith("Transformation complete:")]
+            self.assertEqual(len(summaries), len(names))
+            for name, line in zip(names, summaries):
+                self.assertTrue(line.endswith(os.path.join(temp_dir, name)))
+
 
 class TestDataValidation(unittest.TestCase):
     """Test data validation and edge cases."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        self.transformer = ManufacturingToGHGTransformer()
+    @classmethod
+    def setUpClass(cls):
+        """Build the (stateless) transformer once for all tests."""
+        cls.transformer = ManufacturingToGHGTransformer()
 
     def test_missing_organization(self):
         """Test handling of missing organization data."""
@@ -411,6 +506,57 @@ class TestDataValidation(unittest.TestCase):
 
         self.assertEqual(result["total_emissions"], 0.0)
 
+    def test_consumption_missing_fields(self):
+        """Test that missing consumption fields fall back to their defaults."""
+        source_data = {
+            "organization": {"name": "Test"},
+            "manufacturing_activities": [
+                {
+                    "activity_id": "A001",
+                    "energy_consumptions": [
+                        {"energy_type": {}, "amount": 10},
+                        {"energy_type": {"name": "diesel"}, "unit": "liters"}
+                    ]
+                }
+            ]
+        }
+
+        result = self.transformer.transform(source_data)
+
+        unknown, diesel = result["emissions"]
+        self.assertEqual(unknown["source_category"], "unknown")
+        self.assertEqual(unknown["activity_data"]["energy_unit"], "")
+        self.assertEqual(diesel["activity_data"]["energy_amount"], 0)
+        self.assertEqual(result["total_emissions"], 0.0)
+
+    def test_drop_zero_emissions(self):
+        """Test that zero-amount and unknown-type rows are omitted when requested."""
+        source_data = {
+            "organization": {"name": "Test"},
+            "manufacturing_activities": [
+                {
+                    "activity_id": "A001",
+                    "activity_name": "Test",
+                    "facility": "Plant",
+                    "start_date": "2024-01-01",
+                    "end_date": "2024-01-31",
+                    "energy_consumptions": [
+                        {"energy_type": {"name": "electricity"}, "amount": 0, "unit": "kWh"},
+                        {"energy_type": {"name": "steam"}, "amount": 500, "unit": "kg"},
+                        {"energy_type": {"name": "diesel"}, "amount": 100, "unit": "liters"}
+                    ]
+                }
+            ]
+        }
+
+        kept = self.transformer.transform(source_data)
+        dropped = ManufacturingToGHGTransformer(drop_zero_emissions=True).transform(source_data)
+
+        self.assertEqual(len(kept["emissions"]), 3)
+        self.assertEqual([e["source_category"] for e in dropped["emissions"]], ["diesel"])
+        for key in ("total_scope1", "total_scope2", "total_emissions"):
+            self.assertEqual(dropped[key], kept[key])
+
 
 def run_all_tests():
     """Run all tests and generate a report."""
@@ -441,4 +587,9 @@ def run_all_tests():
 
 
 if __name__ == "__main__":
+    import sys
+
+    if '--parallel' in sys.argv:
+        from parallel_test_runner import run_tests_parallel
+        sys.exit(run_tests_parallel(__file__, run_all_tests))
     run_all_tests()
@@ -5,10 +5,60 @@ This module implements rule-based transformation from manufacturing ontology
 to GHG emission report ontology following MDA principles.
 """
 
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
 import json
+import sys
+
+try:
+    import orjson
+
+    def _dumps_indented(obj: Any) -> bytes:
+        """Serialize obj to two-space indented, UTF-8 encoded JSON."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps_indented(obj: Any) -> bytes:
+        """Serialize obj to two-space indented, UTF-8 encoded JSON."""
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+    _loads = json.loads
+
+
+# Emission @type tags, interned once and looked up by scope number
+SCOPE1_TAG = sys.intern("ghg:Scope1Emission")
+SCOPE2_TAG = sys.intern("ghg:Scope2Emission")
+SCOPE_TAGS = {1: SCOPE1_TAG, 2: SCOPE2_TAG}
+
+# Fields every well-formed energy consumption record carries
+_consumption_fields = itemgetter("energy_type", "amount", "unit")
+
+
+@lru_cache(maxsize=64)
+def normalize_energy_type(energy_type: str) -> str:
+    """
+    Normalize an energy type name to its emission factor key.
+
+    Args:
+        energy_type: Energy type name (e.g., "Natural Gas")
+
+    Returns:
+        Lowercase, underscore-separated key (e.g., "natural_gas")
+    """
+    return energy_type.lower().replace(" ", "_")
+
+
+@lru_cache(maxsize=256)
+def _make_report_id(org_name: str, period: str) -> str:
+    """Build the report ID from the first letters of up to three words of the organization name."""
+    org_abbr = "".join(word[0].upper() for word in org_name.split()[:3])
+    return f"GHG-{org_abbr}-{period}"
 
 
 class EmissionFactors:
@@ -26,25 +76,56 @@ class EmissionFactors:
         "coal": 2.42,              # kg-CO2/kg
     }
 
-    # Scope classification
+    # Scope classification; SCOPE_MAP is built from these lists for lookups
     SCOPE_1_TYPES = ["natural_gas", "fuel_oil", "diesel", "gasoline", "lpg", "coal"]
     SCOPE_2_TYPES = ["electricity"]
+    SCOPE_MAP = {
+        **{energy_type: 1 for energy_type in SCOPE_1_TYPES},
+        **{energy_type: 2 for energy_type in SCOPE_2_TYPES}
+    }
+
+    # (factor, scope) per energy type; filled in below the class body
+    FACTOR_SCOPE: Dict[str, Tuple[float, int]] = {}
 
     @classmethod
     def get_factor(cls, energy_type: str) -> float:
         """Get emission factor for given energy type."""
-        energy_type_normalized = energy_type.lower().replace(" ", "_")
-        return cls.FACTORS.get(energy_type_normalized, 0.0)
+        return cls.get_factor_normalized(normalize_energy_type(energy_type))
 
     @classmethod
     def get_scope(cls, energy_type: str) -> int:
         """Determine emission scope (1 or 2) for given energy type."""
-        energy_type_normalized = energy_type.lower().replace(" ", "_")
-        if energy_type_normalized in cls.SCOPE_1_TYPES:
-            return 1
-        elif energy_type_normalized in cls.SCOPE_2_TYPES:
-            return 2
-        return 1  # Default to Scope 1
+        return cls.get_scope_normalized(normalize_energy_type(energy_type))
+
+    @classmethod
+    def get_factor_normalized(cls, key: str) -> float:
+        """Get emission factor for an already-normalized energy type key."""
+        return cls.FACTORS.get(key, 0.0)
+
+    @classmethod
+    def get_scope_normalized(cls, key: str) -> int:
+        """Determine emission scope (1 or 2) for an already-normalized energy type key."""
+        return cls.SCOPE_MAP.get(key, 1)  # Default to Scope 1
+
+    @classmethod
+    def get_info(cls, energy_type: str) -> Tuple[float, int]:
+        """
+        Get emission factor and scope for given energy type in one lookup.
+
+        Args:
+            energy_type: Energy type name
+
+        Returns:
+            Tuple of (emission factor, scope); (0.0, 1) for unknown types
+        """
+        return cls.FACTOR_SCOPE.get(normalize_energy_type(energy_type), (0.0, 1))
+
+
+# Built outside the class body, whose comprehensions cannot see class attributes
+EmissionFactors.FACTOR_SCOPE.update(
+    (key, (factor, EmissionFactors.SCOPE_MAP.get(key, 1)))
+    for key, factor in EmissionFactors.FACTORS.items()
+)
 
 
 class ManufacturingToGHGTransformer:
@@ -53,8 +134,24 @@ class ManufacturingToGHGTransformer:
     following the defined ontology mappings.
     """
 
-    def __init__(self):
-        self.emission_factors = EmissionFactors()
+    # JSON-LD context of every report; each report gets its own copy
+    _CONTEXT = {
+        "ghg": "http://example.org/ghg-report#",
+        "xsd": "http://www.w3.org/2001/XMLSchema#"
+    }
+
+    # EmissionFactors is all classmethods; kept as an attribute for existing callers
+    emission_factors = EmissionFactors
+
+    def __init__(self, drop_zero_emissions: bool = False):
+        """
+        Initialize the transformer.
+
+        Args:
+            drop_zero_emissions: Omit emission entries for unknown energy types
+                (factor 0) and zero amounts instead of reporting them as 0 kg-CO2
+        """
+        self.drop_zero_emissions = drop_zero_emissions
 
     def transform(self, source_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -70,18 +167,15 @@ class ManufacturingToGHGTransformer:
         activities = source_data.get("manufacturing_activities", [])
         organization = source_data.get("organization", {})
 
-        # Transform each activity to emissions
-        emissions = []
-        for activity in activities:
-            activity_emissions = self._transform_activity(activity)
-            emissions.extend(activity_emissions)
-
-        # Aggregate emissions by scope
-        scope1_emissions = [e for e in emissions if e.get("@type") == "ghg:Scope1Emission"]
-        scope2_emissions = [e for e in emissions if e.get("@type") == "ghg:Scope2Emission"]
+        # Transform each activity to emissions; per-scope CO2 totals are
+        # accumulated while the rows are built
+        scope_totals = {1: 0, 2: 0}
+        emissions = list(chain.from_iterable(
+            self._transform_activity(activity, scope_totals) for activity in activities
+        ))
 
-        total_scope1 = sum(e.get("co2_amount", 0) for e in scope1_emissions)
-        total_scope2 = sum(e.get("co2_amount", 0) for e in scope2_emissions)
+        total_scope1 = scope_totals[1]
+        total_scope2 = scope_totals[2]
         total_emissions = total_scope1 + total_scope2
 
         # Determine reporting period from activities
@@ -89,10 +183,7 @@ class ManufacturingToGHGTransformer:
 
         # Create emission report
         report = {
-            "@context": {
-                "ghg": "http://example.org/ghg-report#",
-                "xsd": "http://www.w3.org/2001/XMLSchema#"
-            },
+            "@context": dict(self._CONTEXT),
             "@type": "ghg:EmissionReport",
             "report_id": self._generate_report_id(organization, reporting_period),
             "reporting_period": reporting_period,
@@ -109,12 +200,18 @@ class ManufacturingToGHGTransformer:
 
         return report
 
-    def _transform_activity(self, activity: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _transform_activity(
+        self,
+        activity: Dict[str, Any],
+        scope_totals: Optional[Dict[int, float]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Transform a single manufacturing activity to emission entries.
 
         Args:
             activity: Manufacturing activity data
+            scope_totals: Running CO2 totals keyed by scope (1 or 2); each
+                entry's rounded co2_amount is added in place
 
         Returns:
             List of emission entries
@@ -122,34 +219,52 @@ class ManufacturingToGHGTransformer:
         emissions = []
         energy_consumptions = activity.get("energy_consumptions", [])
 
+        # Fields shared by every emission entry of this activity
+        emission_source = f"{activity.get('facility', 'Unknown')} - {activity.get('activity_name', 'Unknown Activity')}"
+        activity_id = activity.get("activity_id")
+        start_date = activity.get("start_date")
+        end_date = activity.get("end_date")
+        get_info = EmissionFactors.get_info
+
         for consumption in energy_consumptions:
-            energy_type = consumption.get("energy_type", {})
-            energy_type_name = energy_type.get("name", "unknown")
-            amount = consumption.get("amount", 0)
-            unit = consumption.get("unit", "")
+            try:
+                energy_type, amount, unit = _consumption_fields(consumption)
+                energy_type_name = energy_type["name"]
+            except KeyError:
+                # Some fields are missing; fall back to their defaults
+                energy_type = consumption.get("energy_type", {})
+                energy_type_name = energy_type.get("name", "unknown")
+                amount = consumption.get("amount", 0)
+                unit = consumption.get("unit", "")
+
+            # Look up emission factor and scope together
+            emission_factor, scope = get_info(energy_type_name)
+
+            # Zero rows do not change any total, so they can be skipped outright
+            if self.drop_zero_emissions and (emission_factor == 0.0 or amount == 0):
+                continue
 
             # Calculate CO2 emissions
-            emission_factor = self.emission_factors.get_factor(energy_type_name)
-            co2_amount = amount * emission_factor
+            co2_amount = round(amount * emission_factor, 2)
+            emission_type = SCOPE_TAGS[scope]
 
-            # Determine scope
-            scope = self.emission_factors.get_scope(energy_type_name)
-            emission_type = f"ghg:Scope{scope}Emission"
+            if scope_totals is not None:
+                scope_totals[scope] += co2_amount
 
             # Create emission entry
             emission = {
                 "@type": emission_type,
-                "emission_source": f"{activity.get('facility', 'Unknown')} - {activity.get('activity_name', 'Unknown Activity')}",
+                "emission_source": emission_source,
                 "source_category": energy_type_name,
-                "co2_amount": round(co2_amount, 2),
+                "co2_amount": co2_amount,
                 "calculation_method": "Activity-based calculation using standard emission factors",
                 "emission_factor": emission_factor,
                 "activity_data": {
-                    "activity_id": activity.get("activity_id"),
+                    "activity_id": activity_id,
                     "energy_amount": amount,
                     "energy_unit": unit,
-                    "start_date": activity.get("start_date"),
-                    "end_date": activity.get("end_date")
+                    "start_date": start_date,
+                    "end_date": end_date
                 }
             }
 
@@ -170,18 +285,20 @@ class ManufacturingToGHGTransformer:
         if not activities:
             return datetime.now().strftime("%Y-%m")
 
-        # Find earliest start and latest end dates
-        dates = []
-        for activity in activities:
-            if activity.get("start_date"):
-                dates.append(activity["start_date"])
-            if activity.get("end_date"):
-                dates.append(activity["end_date"])
-
-        if dates:
-            dates.sort()
+        # Find the earliest of all start and end dates
+        earliest = min(
+            (
+                date
+                for activity in activities
+                for date in (activity.get("start_date"), activity.get("end_date"))
+                if date
+            ),
+            default=None
+        )
+
+        if earliest:
             # Use year and month from earliest date
-            return dates[0][:7]  # YYYY-MM format
+            return earliest[:7]  # YYYY-MM format
 
         return datetime.now().strftime("%Y-%m")
 
@@ -196,10 +313,28 @@ class ManufacturingToGHGTransformer:
         Returns:
             Report ID string
         """
-        org_name = organization.get("name", "ORG")
         # Create simple ID from organization and period
-        org_abbr = "".join(word[0].upper() for word in org_name.split()[:3])
-        return f"GHG-{org_abbr}-{period}"
+        return _make_report_id(organization.get("name", "ORG"), period)
+
+
+# The transformer holds no per-report state, so file helpers share one instance
+_transformer = ManufacturingToGHGTransformer()
+
+
+def _transform_path(input_path: str, output_path: str) -> Dict[str, Any]:
+    """Read, transform and write one file with the shared transformer."""
+    # Read source data
+    with open(input_path, 'rb') as f:
+        source_data = _loads(f.read())
+
+    # Transform
+    target_data = _transformer.transform(source_data)
+
+    # Write target data
+    with open(output_path, 'wb') as f:
+        f.write(_dumps_indented(target_data))
+
+    return target_data
 
 
 def transform_file(input_path: str, output_path: str) -> None:
@@ -210,21 +345,34 @@ def transform_file(input_path: str, output_path: str) -> None:
         input_path: Path to source JSON file
         output_path: Path to output JSON file
     """
-    transformer = ManufacturingToGHGTransformer()
+    target_data = _transform_path(input_path, output_path)
 
-    # Read source data
-    with open(input_path, 'r', encoding='utf-8') as f:
-        source_data = json.load(f)
+    print(f"Transformation complete: {input_path} -> {output_path}")
+    print(f"Total emissions: {target_data['total_emissions']} kg-CO2")
 
-    # Transform
-    target_data = transformer.transform(source_data)
 
-    # Write target data
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(target_data, f, indent=2, ensure_ascii=False)
+def transform_files(pairs: Iterable[Tuple[str, str]], workers: int = 8) -> List[Dict[str, Any]]:
+    """
+    Transform several source JSON files, overlapping their file I/O on a thread pool.
 
-    print(f"Transformation complete: {input_path} -> {output_path}")
-    print(f"Total emissions: {target_data['total_emissions']} kg-CO2")
+    Args:
+        pairs: (input_path, output_path) tuples; any iterable, including a generator
+        workers: Maximum number of worker threads
+
+    Returns:
+        Transformed reports, in the same order as pairs
+    """
+    # Materialize once: the pairs are iterated again for the summary below
+    pairs = list(pairs)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        reports = list(executor.map(lambda pair: _transform_path(*pair), pairs))
+
+    for (input_path, output_path), target_data in zip(pairs, reports):
+        print(f"Transformation complete: {input_path} -> {output_path}")
+        print(f"Total emissions: {target_data['total_emissions']} kg-CO2")
+
+    return reports
 
 
 if __name__ == "__main__":